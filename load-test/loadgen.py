@@ -0,0 +1,209 @@
+"""
+Open-loop load generator for the web server: starts /data web socket sessions and /verify POSTs at a Poisson arrival
+rate and reports throughput, latency percentiles per message type, and error and timeout rates
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+from collections import Counter, defaultdict
+
+import httpx
+import websockets
+
+# PCFs submitted to /data with their relative weights, in the shape the React form sends them
+DEFAULT_PCFS = [
+    {"a": "2*n + 1", "b": "n**2", "symbol": "n", "i": 100, "weight": 4},  # 4/pi
+    {"a": "n + 3", "b": "-n", "symbol": "n", "i": 100, "weight": 2},  # e
+    {"a": "2*n + 3", "b": "n**2", "symbol": "n", "i": 1000, "weight": 2},
+    {"a": "6*n + 3", "b": "n**4", "symbol": "n", "i": 1000, "weight": 1},
+    {"a": "1", "b": "1", "symbol": "", "i": 100, "weight": 1},  # golden ratio, no symbol so no convergence check
+]
+# limits posted to /verify, as the React app does once it receives a limit
+DEFAULT_EXPRESSIONS = [
+    "1.2732395447351626861510701069801148962756771659236515899813387524711743810739",
+    "2.7182818284590452353602874713526624977572470936999595749669676277240766303535",
+]
+
+
+class Stats:
+    """
+    Latency samples and outcome counts per message type
+    """
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.started = Counter()
+        self.errors = Counter()
+        self.timeouts = Counter()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def record(self, message_type: str, seconds: float) -> None:
+        self.latencies[message_type].append(seconds)
+
+    def report(self, elapsed: float) -> dict:
+        """
+        Summarize the run
+        :param elapsed: wall clock seconds from the first arrival until the last request finished
+        :return: per message type count, throughput, latency percentiles in milliseconds, error and timeout rates
+        """
+        summary = {}
+        for message_type in sorted(set(self.latencies) | set(self.started)):
+            samples = sorted(self.latencies[message_type])
+            started = self.started[message_type]
+            summary[message_type] = {
+                "count": len(samples),
+                "throughput": len(samples) / elapsed if elapsed else 0.0,
+                "p50_ms": percentile(samples, 50) * 1000,
+                "p95_ms": percentile(samples, 95) * 1000,
+                "p99_ms": percentile(samples, 99) * 1000,
+                "error_rate": self.errors[message_type] / started if started else None,
+                "timeout_rate": self.timeouts[message_type] / started if started else None,
+            }
+        return {"elapsed_s": elapsed, "peak_in_flight": self.peak_in_flight, "message_types": summary}
+
+
+def percentile(samples: list[float], p: float) -> float:
+    """
+    Nearest-rank percentile
+    :param samples: values sorted in ascending order
+    :param p: percentile in (0, 100]
+    :return: the smallest sample that is greater than or equal to p percent of the samples, NaN if there are none
+    """
+    if not samples:
+        return math.nan
+    return samples[max(0, math.ceil(p / 100 * len(samples)) - 1)]
+
+
+async def data_session(ws_url: str, pcf: dict, timeout: float, stats: Stats) -> None:
+    """
+    Submit one PCF over the /data web socket and time each message until the delta sequence (or a non-convergence
+    verdict) arrives. Latencies of individual messages are measured from when the inputs were sent.
+    """
+    stats.started["data"] += 1
+    body = {key: value for key, value in pcf.items() if key != "weight"}
+
+    async def converse() -> None:
+        async with websockets.connect(ws_url, open_timeout=timeout, max_size=None) as websocket:
+            sent = time.perf_counter()
+            await websocket.send(json.dumps(body))
+            while True:
+                try:
+                    message = json.loads(await websocket.recv())
+                except websockets.ConnectionClosedOK:
+                    break
+                received = time.perf_counter() - sent
+                for key in message:
+                    stats.record(f"data:{key}", received)
+                if "delta" in message or message.get("is_convergent") is False:
+                    break
+            stats.record("data", time.perf_counter() - sent)
+
+    try:
+        await asyncio.wait_for(converse(), timeout)
+    except asyncio.TimeoutError:
+        stats.timeouts["data"] += 1
+    except Exception:
+        stats.errors["data"] += 1
+
+
+async def verify_request(client: httpx.AsyncClient, url: str, expression: str, timeout: float, stats: Stats) -> None:
+    """
+    POST one expression to /verify and time the response. Failed Wolfram API calls count as errors.
+    """
+    stats.started["verify"] += 1
+    sent = time.perf_counter()
+    try:
+        response = await client.post(url, json={"expression": expression}, timeout=timeout)
+    except httpx.TimeoutException:
+        stats.timeouts["verify"] += 1
+        return
+    except httpx.HTTPError:
+        stats.errors["verify"] += 1
+        return
+    # the web server answers 200 with a null result when the Wolfram API call failed
+    if response.status_code != 200 or response.json().get("wolfram_says") is None:
+        stats.errors["verify"] += 1
+        return
+    stats.record("verify", time.perf_counter() - sent)
+
+
+async def run(url: str, rate: float, duration: float, verify_fraction: float, timeout: float, pcfs: list[dict],
+              expressions: list[str], seed: int | None) -> dict:
+    """
+    Generate Poisson arrivals at the given rate for the given duration and wait for all of them to finish
+    :return: the report produced by Stats.report
+    """
+    rng = random.Random(seed)
+    stats = Stats()
+    ws_url = url.replace("http", "ws", 1) + "/data"
+    weights = [pcf.get("weight", 1) for pcf in pcfs]
+
+    async def tracked(request) -> None:
+        stats.in_flight += 1
+        stats.peak_in_flight = max(stats.peak_in_flight, stats.in_flight)
+        try:
+            await request
+        finally:
+            stats.in_flight -= 1
+
+    async with httpx.AsyncClient(limits=httpx.Limits(max_connections=None, max_keepalive_connections=None)) as client:
+        tasks = []
+        start = time.perf_counter()
+        deadline = start + duration
+        while True:
+            await asyncio.sleep(rng.expovariate(rate))
+            if time.perf_counter() >= deadline:
+                break
+            if rng.random() < verify_fraction:
+                request = verify_request(client, url + "/verify", rng.choice(expressions), timeout, stats)
+            else:
+                request = data_session(ws_url, rng.choices(pcfs, weights)[0], timeout, stats)
+            tasks.append(asyncio.ensure_future(tracked(request)))
+        await asyncio.gather(*tasks)
+        return stats.report(time.perf_counter() - start)
+
+
+def print_report(report: dict) -> None:
+    print(f"elapsed {report['elapsed_s']:.1f}s, peak in flight {report['peak_in_flight']}")
+    print(f"{'message type':<20}{'count':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+          f"{'errors':>9}{'timeouts':>10}")
+    for message_type, row in report["message_types"].items():
+        errors = "" if row["error_rate"] is None else f"{row['error_rate']:.1%}"
+        timeouts = "" if row["timeout_rate"] is None else f"{row['timeout_rate']:.1%}"
+        print(f"{message_type:<20}{row['count']:>8}{row['throughput']:>9.2f}{row['p50_ms']:>10.0f}"
+              f"{row['p95_ms']:>10.0f}{row['p99_ms']:>10.0f}{errors:>9}{timeouts:>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load generator for the Ramanujan Machine web server")
+    parser.add_argument("--url", default="http://localhost:8000", help="base URL of the web server")
+    parser.add_argument("--rate", type=float, default=5.0, help="mean arrivals per second")
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds to keep generating arrivals")
+    parser.add_argument("--verify-fraction", type=float, default=0.5,
+                        help="fraction of arrivals that are /verify POSTs, the rest are /data sessions")
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds before a request counts as timed out")
+    parser.add_argument("--pcfs", help="JSON file with a list of {a, b, symbol, i, weight} objects to submit")
+    parser.add_argument("--expressions", help="JSON file with a list of limits to POST to /verify")
+    parser.add_argument("--seed", type=int, help="random seed for reproducible arrival sequences")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    pcfs = DEFAULT_PCFS
+    if args.pcfs:
+        with open(args.pcfs) as f:
+            pcfs = json.load(f)
+    expressions = DEFAULT_EXPRESSIONS
+    if args.expressions:
+        with open(args.expressions) as f:
+            expressions = json.load(f)
+
+    result = asyncio.run(run(args.url.rstrip("/"), args.rate, args.duration, args.verify_fraction, args.timeout,
+                             pcfs, expressions, args.seed))
+    print_report(result)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
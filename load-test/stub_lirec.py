@@ -0,0 +1,51 @@
+"""
+Stand-in for the LIReC gRPC server that answers every Identify request with a canned closed form after a tunable delay
+"""
+import argparse
+import random
+import time
+from concurrent import futures
+
+import grpc
+
+import lirec_pb2
+import lirec_pb2_grpc
+
+
+class StubLIReCServicer(lirec_pb2_grpc.LIReCServicer):
+    """
+    Implements protos/lirec.proto without a LIReC database
+    """
+
+    def __init__(self, latency: float, jitter: float, closed_forms: list[str]):
+        self.latency = latency
+        self.jitter = jitter
+        self.closed_forms = closed_forms
+
+    def Identify(self, request: lirec_pb2.IdentifyRequest, context: object) -> lirec_pb2.IdentifyResponse:
+        time.sleep(max(0.0, random.gauss(self.latency, self.jitter)))
+        return lirec_pb2.IdentifyResponse(closed_forms=self.closed_forms)
+
+
+def serve(port: int, latency: float, jitter: float, workers: int, closed_forms: list[str]) -> None:
+    """
+    Start up the stub gRPC server and block until it is terminated
+    """
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=workers))
+    lirec_pb2_grpc.add_LIReCServicer_to_server(StubLIReCServicer(latency, jitter, closed_forms), server)
+    server.add_insecure_port(f"[::]:{port}")
+    server.start()
+    print(f"stub LIReC listening on port {port} with {latency}s +/- {jitter}s latency")
+    server.wait_for_termination()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub LIReC gRPC server")
+    parser.add_argument("--port", type=int, default=50051)
+    parser.add_argument("--latency", type=float, default=0.5, help="mean seconds to wait before responding")
+    parser.add_argument("--jitter", type=float, default=0.0, help="standard deviation of the latency in seconds")
+    parser.add_argument("--workers", type=int, default=10, help="size of the server thread pool")
+    parser.add_argument("--closed-form", action="append", dest="closed_forms",
+                        help="closed form to return, may be repeated (default: 4/pi)")
+    args = parser.parse_args()
+    serve(args.port, args.latency, args.jitter, args.workers, args.closed_forms or ["4/pi"])
@@ -0,0 +1,86 @@
+"""
+Stand-in for the Wolfram Alpha v2/query results API that returns a canned PossibleClosedForm pod after a tunable delay
+"""
+import argparse
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def closed_form_result(query: str) -> dict:
+    """
+    Build a response shaped like what the Wolfram API returns for includepodid=PossibleClosedForm
+    :param query: the input that was sent to the API
+    :return: JSON response body
+    """
+    return {
+        "queryresult": {
+            "success": True,
+            "error": False,
+            "numpods": 1,
+            "datatypes": "",
+            "inputstring": query,
+            "pods": [{
+                "title": "Possible closed forms",
+                "id": "PossibleClosedForm",
+                "numsubpods": 1,
+                "subpods": [{"title": "", "plaintext": f"{query[:20]}... ≈ 4/π", "moutput": "4/Pi"}],
+                "infos": [{"text": "π is Archimedes' constant",
+                           "links": [{"url": "http://reference.wolfram.com/language/ref/Pi.html",
+                                      "text": "Documentation", "title": "Mathematica"}]}]
+            }]
+        }
+    }
+
+
+class StubWolframHandler(BaseHTTPRequestHandler):
+    """
+    Serves GET /v2/query, mirroring the JSON output of the real API
+    """
+    latency = 1.0
+    jitter = 0.0
+    error_rate = 0.0
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        if url.path != "/v2/query":
+            self.send_error(404)
+            return
+
+        time.sleep(max(0.0, random.gauss(self.latency, self.jitter)))
+        query = parse_qs(url.query).get("input", [""])[0]
+        if not query or random.random() < self.error_rate:
+            body = {"queryresult": {"success": False, "error": {"code": "1000", "msg": "Stub error"}, "numpods": 0}}
+        else:
+            body = closed_form_result(query)
+
+        content = json.dumps(body).encode("utf8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format: str, *args: object) -> None:
+        """
+        Keep request logging from dominating the console under load
+        """
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub Wolfram Alpha results API")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=1.0, help="mean seconds to wait before responding")
+    parser.add_argument("--jitter", type=float, default=0.0, help="standard deviation of the latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of queries answered with an API error")
+    args = parser.parse_args()
+
+    StubWolframHandler.latency = args.latency
+    StubWolframHandler.jitter = args.jitter
+    StubWolframHandler.error_rate = args.error_rate
+    server = ThreadingHTTPServer(("", args.port), StubWolframHandler)
+    print(f"stub Wolfram API listening on http://localhost:{args.port}/v2/query "
+          f"with {args.latency}s +/- {args.jitter}s latency")
+    server.serve_forever()
@@ -4,7 +4,7 @@ import signal
 import grpc
 import lirec_pb2
 import sympy.core.numbers
-from constants import EXTERNAL_PROCESS_TIMEOUT
+from constants import EXTERNAL_PROCESS_TIMEOUT, LIREC_ADDRESS
 import lirec_pb2_grpc
 from ramanujantools.pcf import PCF
 
@@ -45,7 +45,7 @@ def lirec_identify(limit) -> list[sympy.core.numbers.Number]:
     Invokes LIReC pslq algorithm
     """
     try:
-        with grpc.insecure_channel('localhost:50051') as channel:
+        with grpc.insecure_channel(LIREC_ADDRESS) as channel:
             stub = lirec_pb2_grpc.LIReCStub(channel)
             request = lirec_pb2.IdentifyRequest(limit=limit)
             response = stub.Identify(request)
@@ -0,0 +1,217 @@
+"""
+Local index of well known constants and their small Mobius transforms, used to identify a limit before asking LIReC
+
+The index is a flat file of fixed width records sorted by key, which is memory mapped and binary searched on lookup.
+File layout (all integers little endian):
+    header: 7 byte magic b"RMCONST", 1 byte format version, uint32 record count, uint16 key width, uint16 label width
+    records: key (ASCII, key width bytes) followed by label (UTF-8, space padded to label width bytes)
+A key is the sign ('+' or '-'), the decimal exponent offset by EXPONENT_BIAS as 3 digits, and the leading significant
+digits of the value, truncated (not rounded) to CONSTANT_INDEX_DIGITS. The build is deterministic, so the same
+parameters always produce a byte for byte identical file.
+
+Build the index with:
+    python constant_index.py [--output constant_index.bin] [--range 4]
+"""
+import argparse
+import functools
+import logging
+import math
+import mmap
+import os
+import re
+import struct
+import tempfile
+from itertools import product
+from pathlib import Path
+
+import mpmath
+import sympy
+
+from constants import (CONSTANT_INDEX_COEFFICIENT_RANGE, CONSTANT_INDEX_DIGITS, CONSTANT_INDEX_FILE,
+                       CONSTANT_INDEX_MIN_DIGITS)
+
+logger = logging.getLogger('rm_web_app')
+
+MAGIC = b"RMCONST"
+VERSION = 2
+HEADER = struct.Struct("<7sBIHH")
+EXPONENT_BIAS = 500
+# sign + 3 exponent digits + mantissa digits
+KEY_WIDTH = 4 + CONSTANT_INDEX_DIGITS
+LABEL_WIDTH = 64
+# digits computed beyond those kept in a key when building, so that the kept digits are exact once truncated
+GUARD_DIGITS = 20
+
+# constant -> name used in labels, which follows LIReC's naming since the React app annotates results with LIReC's
+# constant metadata (react-frontend/src/lib/constants.ts), where e.g. E is the Erdos-Borwein constant rather than e
+BASE_CONSTANTS = {sympy.pi: "pi", sympy.E: "e", sympy.log(2): "ln2", sympy.zeta(3): "Zeta3", sympy.Catalan: "C",
+                  sympy.EulerGamma: "gamma", sympy.sqrt(2): "sqrt2", sympy.GoldenRatio: "phi", sympy.pi ** 2: "pi**2",
+                  sympy.log(3): "ln(3)"}
+
+
+def _key(negative: bool, exponent: int, significant_digits: str) -> str:
+    """
+    Format an index key
+    :param negative: whether the value is negative
+    :param exponent: decimal exponent of the leading significant digit
+    :param significant_digits: leading significant digits of the value, already cut to the wanted length
+    :return: sign, biased exponent and leading digits of the value
+    """
+    return f"{'-' if negative else '+'}{exponent + EXPONENT_BIAS:03d}{significant_digits}"
+
+
+def _value_key(value: mpmath.mpf, digits: int) -> str:
+    """
+    Format a nonzero value computed with GUARD_DIGITS to spare as an index key
+    :param value: the value to format
+    :param digits: number of significant digits to keep in the key
+    :return: the key, with the digits of the value truncated rather than rounded
+    """
+    # format the guard digits too and cut them off, so rounding cannot carry into the kept digits
+    mantissa, _, exponent = mpmath.nstr(abs(value), digits + GUARD_DIGITS, min_fixed=1, max_fixed=0,
+                                        strip_zeros=False).partition('e')
+    return _key(value < 0, int(exponent or 0), mantissa.replace('.', '')[:digits])
+
+
+def _transforms(coefficient_range: int) -> list[tuple[int, int, int, int]]:
+    """
+    Enumerate the distinct non-degenerate Mobius transforms (a*x + b)/(c*x + d) with small integer coefficients
+    :param coefficient_range: largest absolute value of a coefficient
+    :return: coefficient tuples (a, b, c, d), simplest first
+    """
+    coefficients = range(-coefficient_range, coefficient_range + 1)
+    transforms = set()
+    for a, b, c, d in product(coefficients, repeat=4):
+        if a * d - b * c == 0:
+            continue
+        divisor = math.gcd(a, b, c, d)
+        # normalize so that the denominator has a positive leading coefficient
+        if c < 0 or (c == 0 and d < 0):
+            divisor = -divisor
+        transforms.add((a // divisor, b // divisor, c // divisor, d // divisor))
+    return sorted(transforms, key=lambda t: (sum(abs(x) for x in t), t[2] != 0, t))
+
+
+def build(path: Path, coefficient_range: int = CONSTANT_INDEX_COEFFICIENT_RANGE) -> int:
+    """
+    Compute the values of all indexed expressions and write them to an index file
+    :param path: destination of the index file
+    :param coefficient_range: largest absolute value of a Mobius transform coefficient
+    :return: the number of records written
+    """
+    records = {}
+    transforms = _transforms(coefficient_range)
+    with mpmath.workdps(CONSTANT_INDEX_DIGITS + 2 * GUARD_DIGITS):
+        for constant, name in BASE_CONSTANTS.items():
+            value = mpmath.mpf(str(sympy.N(constant, CONSTANT_INDEX_DIGITS + 2 * GUARD_DIGITS)))
+            # print the transforms of a symbol so that the label spells the constant the way LIReC does
+            x = sympy.Symbol(name)
+            for a, b, c, d in transforms:
+                label = str((a * x + b) / (c * x + d)).encode("utf8")
+                if len(label) > LABEL_WIDTH:
+                    logger.warning(f"Skipping constant index label longer than {LABEL_WIDTH} bytes: {label}")
+                    continue
+                # transforms are ordered simplest first, so a value reachable in several ways keeps its simplest label
+                records.setdefault(_value_key((a * value + b) / (c * value + d), CONSTANT_INDEX_DIGITS), label)
+
+    # write next to the destination and swap it into place, since truncating a file that a server has memory mapped
+    # would crash the server
+    fd, temporary = tempfile.mkstemp(dir=Path(path).parent, prefix=f".{Path(path).name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(records), KEY_WIDTH, LABEL_WIDTH))
+            for key in sorted(records):
+                f.write(key.encode("ascii") + records[key].ljust(LABEL_WIDTH))
+        os.chmod(temporary, 0o644)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+    logger.info(f"Wrote {len(records)} constant index records to {path}")
+    return len(records)
+
+
+@functools.lru_cache
+def _open(path: Path) -> tuple[mmap.mmap, int, int, int] | None:
+    """
+    Memory map an index file once per process
+    :param path: location of the index file
+    :return: the mapped file, record count, key width and label width, or None if there is no usable index
+    """
+    try:
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Constant index {path} unavailable, all limits will be sent to LIReC: {e}")
+        return None
+    try:
+        magic, version, count, key_width, label_width = HEADER.unpack_from(mapped)
+    except struct.error:
+        logger.warning(f"Ignoring constant index {path} that is too short to hold a header")
+        return None
+    if magic != MAGIC or version != VERSION or len(mapped) != HEADER.size + count * (key_width + label_width):
+        logger.warning(f"Ignoring constant index {path} with unexpected format")
+        return None
+    return mapped, count, key_width, label_width
+
+
+def identify(limit: str, path: Path = None) -> list[str]:
+    """
+    Look up a computed limit in the local constant index
+    :param limit: decimal string representation of the limit
+    :param path: location of the index file, defaults to CONSTANT_INDEX_FILE next to this module
+    :return: closed forms whose leading digits match the limit, empty if there are none
+    """
+    index = _open(path or Path(__file__).parent.resolve() / CONSTANT_INDEX_FILE)
+    if index is None or limit is None:
+        return []
+    mapped, count, key_width, label_width = index
+
+    number = re.fullmatch(r"([-+]?)(\d*)\.?(\d*)(?:[eE]([-+]?\d+))?", str(limit))
+    if number is None:
+        return []
+    sign, integer_part, fraction_part, exponent = number.groups()
+    # slice the digits as written rather than re-rounding them, since keys hold truncated digits
+    significant_digits = (integer_part + fraction_part).lstrip('0')
+    # the last couple of digits of a computed limit may be off due to rounding
+    digits = min(len(significant_digits) - 2, key_width - 4)
+    if digits < CONSTANT_INDEX_MIN_DIGITS:
+        return []
+    leading_zeros = len(integer_part + fraction_part) - len(significant_digits)
+    prefix = _key(sign == '-', len(integer_part) - 1 - leading_zeros + int(exponent or 0),
+                  significant_digits[:digits]).encode("ascii")
+
+    record_width = key_width + label_width
+
+    def record_prefix(i: int) -> bytes:
+        """
+        key of record i cut to the length of the searched prefix
+        """
+        offset = HEADER.size + i * record_width
+        return mapped[offset:offset + len(prefix)]
+
+    low, high = 0, count
+    while low < high:
+        middle = (low + high) // 2
+        if record_prefix(middle) < prefix:
+            low = middle + 1
+        else:
+            high = middle
+
+    matches = []
+    while low < count and record_prefix(low) == prefix:
+        offset = HEADER.size + low * record_width + key_width
+        matches.append(mapped[offset:offset + label_width].decode("utf8").rstrip())
+        low += 1
+    logger.debug(f"constant index matches for {limit}: {matches}")
+    return matches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the local index of known constants")
+    parser.add_argument("--output", type=Path, default=Path(__file__).parent.resolve() / CONSTANT_INDEX_FILE,
+                        help="index file to write")
+    parser.add_argument("--range", type=int, default=CONSTANT_INDEX_COEFFICIENT_RANGE, dest="coefficient_range",
+                        help="largest absolute value of a Mobius transform coefficient")
+    args = parser.parse_args()
+    print(f"Wrote {build(args.output, args.coefficient_range)} records to {args.output}")
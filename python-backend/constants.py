@@ -1,6 +1,8 @@
 """
 A centralized listing of constants that are used as settings for the API
 """
+import os
+
 DEFAULT_PRECISION = 30
 # evalf allows for verbose output via param universally set to this:
 VERBOSE_EVAL = False
@@ -8,3 +10,25 @@ VERBOSE_EVAL = False
 EXTERNAL_PROCESS_TIMEOUT = 10
 # the free Wolfram API limits queries to 200 characters
 WOLFRAM_CHAR_LIMIT = 200
+# Wolfram results API endpoint, overridable e.g. to point at a stub server when load testing
+WOLFRAM_API_URL = os.getenv('WOLFRAM_API_URL', 'https://api.wolframalpha.com/v2/query')
+# address of the LIReC gRPC server, overridable e.g. to point at a stub server when load testing
+LIREC_ADDRESS = os.getenv('LIREC_ADDRESS', 'localhost:50051')
+# file name of the precomputed index of known constants, relative to the python-backend directory
+CONSTANT_INDEX_FILE = "constant_index.bin"
+# number of significant digits stored per value in the constant index
+CONSTANT_INDEX_DIGITS = 30
+# a limit has to agree with an indexed value on at least this many significant digits to count as a match
+CONSTANT_INDEX_MIN_DIGITS = 15
+# Mobius transforms (a*x + b)/(c*x + d) of each constant x are indexed for integer coefficients in [-range, range]
+CONSTANT_INDEX_COEFFICIENT_RANGE = 4
+# static files up to this many bytes are kept in memory once served
+STATIC_CACHE_MAX_FILE_SIZE = 256 * 1024
+# static files smaller than this are not worth precompressing
+STATIC_COMPRESS_MIN_FILE_SIZE = 1024
+# when set, profiled (debug) requests save a flame graph of sampled stacks to this directory instead of being traced
+PROFILE_OUTPUT_DIRECTORY = os.getenv('PROFILE_OUTPUT_DIRECTORY')
+# seconds between stack samples taken for the flame graph of a profiled request
+PROFILE_SAMPLE_INTERVAL = 0.005
+# number of functions, by cumulative time, listed in the profile of a request
+PROFILE_TOP_FUNCTIONS = 10
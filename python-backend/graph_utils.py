@@ -1,11 +1,9 @@
 """Utility functions that generate graphable coordinate pairs for the frontend"""
-import json
 import logging
 from typing import TypedDict
 
 import mpmath
 import sympy
-from fastapi import WebSocket
 from ramanujantools import pcf as pcf_module
 
 GRAPHABLE_TYPES = (int, float, sympy.core.numbers.Integer, sympy.core.numbers.Float)
@@ -21,18 +19,14 @@ class Point2D(TypedDict):
     y: str
 
 
-async def chart_coordinates(pcf: pcf_module.PCF, limit: mpmath.mpf,
-                            iterations: int, websocket: WebSocket) -> None:
+def chart_coordinates(pcf: pcf_module.PCF, limit: mpmath.mpf, iterations: int) -> list[Point2D]:
     """
     graph coords for the error of an expression: |expression - L|
     :param pcf: PCF instance
     :param limit: the computed approximate limit of the expression
     :param iterations: the number of values expected, n max
-    :param websocket: the websocket instance to return incremental data
-    :return: tuple of arrays of [x,y] pairs for graphing purposes
+    :return: array of [x,y] pairs for graphing purposes
     """
     y_values = pcf.delta_sequence(limit=limit, depth=iterations)
     logger.debug(f'y_values: {y_values}')
-    delta_x_y_pairs = [Point2D(x=n, y=str(y_values[n - 1])) for n in range(1, iterations)]
-
-    await websocket.send_json({"delta": json.dumps(delta_x_y_pairs)})
+    return [Point2D(x=n, y=str(y_values[n - 1])) for n in range(1, iterations)]
@@ -1,26 +1,28 @@
 """Entrypoint for the application and REST API handlers"""
+import base64
 import json
 import secrets
 import sys
-from pathlib import Path
 from typing import Annotated
 
 import mpmath
 from fastapi import Depends, FastAPI, HTTPException, Request, status, WebSocket, WebSocketDisconnect, WebSocketException
-from fastapi.responses import JSONResponse, FileResponse, RedirectResponse
+from fastapi.responses import JSONResponse, RedirectResponse, Response
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
-from fastapi.staticfiles import StaticFiles
 from ramanujantools import pcf
 from sympy import sympify
 from sympy.core.numbers import Infinity
 
 import call_wrapper
+import constant_index
 import constants
 import logger
 from custom_secrets import CustomSecrets
 from graph_utils import (chart_coordinates)
 from input import Input, Expression, parse
 from math_utils import laurent, assess_convergence
+from profiling import NullProfiler, RequestProfiler
+from static_assets import PrecompressedStaticFiles
 from wolfram_client import WolframClient
 
 sys.set_int_max_str_digits(0)
@@ -33,7 +35,33 @@ logger = logger.config(True)
 
 mpmath.mp.dps = constants.DEFAULT_PRECISION
 
-app.mount("/form", StaticFiles(directory="build"), name="react")
+react_assets = PrecompressedStaticFiles(directory="build")
+app.mount("/form", react_assets, name="react")
+
+
+def valid_credentials(username: str, password: str) -> bool:
+    """
+    Compare a username and password to the configured basic auth credentials in constant time
+    """
+    input_user = username.encode("utf8")
+    correct_user = CustomSecrets.BasicUser.encode("utf8")
+    input_pass = password.encode("utf8")
+    correct_pass = CustomSecrets.BasicPassword.encode("utf8")
+    return secrets.compare_digest(input_user, correct_user) and secrets.compare_digest(input_pass, correct_pass)
+
+
+def websocket_authenticated(websocket: WebSocket) -> bool:
+    """
+    Check the basic auth credentials the browser sent with the web socket handshake, if any
+    """
+    scheme, _, encoded = websocket.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "basic":
+        return False
+    try:
+        username, _, password = base64.b64decode(encoded).decode("utf8").partition(":")
+    except (ValueError, UnicodeDecodeError):
+        return False
+    return valid_credentials(username, password)
 
 
 def auth(creds: Annotated[HTTPBasicCredentials, Depends(security)]):
@@ -47,11 +75,7 @@ def auth(creds: Annotated[HTTPBasicCredentials, Depends(security)]):
     -------
     True if the credentials are valid, raises HTTPException with 401 Unauthorized otherwise
     """
-    input_user = creds.username.encode("utf8")
-    correct_user = CustomSecrets.BasicUser.encode("utf8")
-    input_pass = creds.password.encode("utf8")
-    correct_pass = CustomSecrets.BasicPassword.encode("utf8")
-    if not (secrets.compare_digest(input_user, correct_user) and secrets.compare_digest(input_pass, correct_pass)):
+    if not valid_credentials(creds.username, creds.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials",
@@ -72,13 +96,12 @@ def default(authenticated=Depends(auth)) -> RedirectResponse:
 
 
 @app.get("/form")
-def serve_frontend(authenticated=Depends(auth)) -> FileResponse:
+async def serve_frontend(request: Request, authenticated=Depends(auth)) -> Response:
     """
     Serves static React UI - facilitates embedding as iframe
     """
     if authenticated:
-        project_path = Path(__file__).parent.resolve()
-        response = FileResponse(str(project_path / "build/index.html"), media_type="text/html")
+        response = await react_assets.get_response("index.html", request.scope)
         response.headers["X-Frame-Options"] = "ALLOW-FROM https://www.ramanujanmachine.com"
         return response
 
@@ -120,38 +143,52 @@ async def data_socket(websocket: WebSocket):
         try:
             data = Input(**(await websocket.receive_json()))
             iterations = data.i
-            (a_func, a, b_func, b, symbol, precision) = parse(data)
-
-            with mpmath.workdps(precision):
-                if len(data.symbol) > 0:
-                    logger.debug('checking for convergence...')
-                    is_convergent = assess_convergence(laurent(a, b, symbol), symbol)
-                    logger.debug('convergence result: {}'.format(is_convergent))
-                    # short circuit if the preliminary test fails
-                    await websocket.send_json({"is_convergent": is_convergent})
-
-                    if is_convergent is False:
-                        logger.debug(f"values do not converge. closing socket.")
-                        await websocket.close()
-
-                limit = call_wrapper.pcf_limit(sympify(data.a), sympify(data.b), iterations)
-                logger.debug(f"limit: {limit}")
-                await websocket.send_json({"limit": "Infinity" if type(limit) is Infinity else str(limit)})
-
-                computed_values: list[str] = call_wrapper.lirec_identify(limit)
-                json_computed_values = []
-                for m in computed_values:
-                    logger.debug(f"identify returned: {m}")
-                    json_computed_values.append(str(m))
-
-                await websocket.send_json(
-                    {"converges_to": json.dumps(json_computed_values)}
-                )
-
-                await chart_coordinates(pcf=pcf.PCF(sympify(data.a), sympify(data.b)),
-                                        limit=mpmath.mpf(limit),
-                                        iterations=iterations,
-                                        websocket=websocket)
+            # profiling is only available to authenticated users and costs nothing when it is off
+            profiler = RequestProfiler() if data.debug and websocket_authenticated(websocket) else NullProfiler()
+
+            with profiler:
+                with profiler.stage("parse"):
+                    (a_func, a, b_func, b, symbol, precision) = parse(data)
+
+                with mpmath.workdps(precision):
+                    if len(data.symbol) > 0:
+                        logger.debug('checking for convergence...')
+                        with profiler.stage("convergence"):
+                            is_convergent = assess_convergence(laurent(a, b, symbol), symbol)
+                        logger.debug('convergence result: {}'.format(is_convergent))
+                        # short circuit if the preliminary test fails
+                        await websocket.send_json({"is_convergent": is_convergent})
+
+                        if is_convergent is False:
+                            logger.debug(f"values do not converge. closing socket.")
+                            await websocket.close()
+
+                    with profiler.stage("limit"):
+                        limit = call_wrapper.pcf_limit(sympify(data.a), sympify(data.b), iterations)
+                    logger.debug(f"limit: {limit}")
+                    await websocket.send_json({"limit": "Infinity" if type(limit) is Infinity else str(limit)})
+
+                    with profiler.stage("identify"):
+                        # famous constants are answered from the local index, only a miss goes over gRPC to LIReC
+                        computed_values: list[str] = (constant_index.identify(limit)
+                                                      or call_wrapper.lirec_identify(limit))
+                    json_computed_values = []
+                    for m in computed_values:
+                        logger.debug(f"identify returned: {m}")
+                        json_computed_values.append(str(m))
+
+                    await websocket.send_json(
+                        {"converges_to": json.dumps(json_computed_values)}
+                    )
+
+                    with profiler.stage("chart"):
+                        delta_x_y_pairs = chart_coordinates(pcf=pcf.PCF(sympify(data.a), sympify(data.b)),
+                                                            limit=mpmath.mpf(limit),
+                                                            iterations=iterations)
+                    await websocket.send_json({"delta": json.dumps(delta_x_y_pairs)})
+
+            if profiler.enabled:
+                await websocket.send_json({"profile": json.dumps(profiler.report())})
 
         except WebSocketDisconnect:
             logger.debug("Websocket disconnected")
@@ -0,0 +1,174 @@
+"""
+Opt-in profiling of a single /data request, enabled by the debug flag of the form inputs
+"""
+import cProfile
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from typing import ContextManager, Iterator
+
+from constants import PROFILE_OUTPUT_DIRECTORY, PROFILE_SAMPLE_INTERVAL, PROFILE_TOP_FUNCTIONS
+
+logger = logging.getLogger('rm_web_app')
+
+SYMPY_PATH = f"{os.sep}sympy{os.sep}"
+
+# cProfile and tracemalloc are process wide, so only one request is profiled at a time
+_profiling = threading.Lock()
+
+
+class NullProfiler:
+    """
+    Stand-in used when profiling is off, so that the request pipeline does not have to check whether it is profiled
+    """
+    enabled = False
+
+    def __enter__(self) -> "NullProfiler":
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        return False
+
+    def stage(self, name: str) -> ContextManager:
+        """
+        Time a stage of the pipeline
+        :param name: stage name reported in the profile
+        """
+        return nullcontext()
+
+
+class RequestProfiler(NullProfiler):
+    """
+    Collects per-stage wall clock timings, the number of sympy function calls, the hottest functions and peak memory
+    allocated while a request is processed. If PROFILE_OUTPUT_DIRECTORY is set, the stacks of the profiled thread are
+    sampled instead and written there in the folded format understood by flamegraph.pl and speedscope. The two modes
+    are exclusive because cProfile (on Python 3.12+) and tracemalloc see every thread, so they would count the sampler
+    thread's work as the request's.
+
+    The event loop thread is shared by every web socket session, so the profilers only run inside stages, which must
+    not await. That way no other session's work is counted towards this request.
+    """
+    enabled = True
+
+    def __init__(self):
+        self.stages: dict[str, float] = {}
+        self.samples: Counter[str] = Counter()
+        self.profile = cProfile.Profile()
+        self.owns_lock = False
+        self.peak_memory = 0
+        self.elapsed = 0.0
+        self.flame_graph = None
+        self._start = 0.0
+        self._sampling = threading.Event()
+        self._in_stage = threading.Event()
+        self._sampler = None
+
+    def __enter__(self) -> "RequestProfiler":
+        self.owns_lock = _profiling.acquire(blocking=False)
+        if self.owns_lock and PROFILE_OUTPUT_DIRECTORY:
+            self._sampling.set()
+            self._sampler = threading.Thread(target=self._sample, args=(threading.get_ident(),), daemon=True)
+            self._sampler.start()
+        elif not self.owns_lock:
+            logger.warning("Another request is being profiled, only stage timings will be collected")
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        self.elapsed = time.perf_counter() - self._start
+        if self.owns_lock:
+            if self._sampler is not None:
+                self._sampling.clear()
+                self._sampler.join()
+                self.flame_graph = self._write_flame_graph()
+            _profiling.release()
+        return False
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        tracing = self.owns_lock and self._sampler is None
+        self._in_stage.set()
+        if tracing:
+            started_tracemalloc = not tracemalloc.is_tracing()
+            if started_tracemalloc:
+                tracemalloc.start()
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            self.profile.enable()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+            if tracing:
+                self.profile.disable()
+                self.peak_memory = max(self.peak_memory, tracemalloc.get_traced_memory()[1] - baseline)
+                if started_tracemalloc:
+                    tracemalloc.stop()
+            self._in_stage.clear()
+
+    def _sample(self, thread_id: int) -> None:
+        """
+        Record the call stack of the profiled thread every PROFILE_SAMPLE_INTERVAL seconds while it is inside a stage,
+        until sampling is stopped
+        """
+        while self._sampling.is_set():
+            if not self._in_stage.wait(PROFILE_SAMPLE_INTERVAL):
+                continue
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack and self._in_stage.is_set():
+                self.samples[";".join(reversed(stack))] += 1
+            time.sleep(PROFILE_SAMPLE_INTERVAL)
+
+    def _write_flame_graph(self) -> str | None:
+        """
+        Save the sampled stacks as one "frame;frame;frame count" line per distinct stack
+        :return: path of the written file, None if it could not be written
+        """
+        path = os.path.join(PROFILE_OUTPUT_DIRECTORY, f"profile-{time.strftime('%Y%m%d-%H%M%S')}-{id(self):x}.folded")
+        try:
+            os.makedirs(PROFILE_OUTPUT_DIRECTORY, exist_ok=True)
+            with open(path, "w") as f:
+                for stack, count in sorted(self.samples.items()):
+                    f.write(f"{stack} {count}\n")
+        except OSError as e:
+            logger.error(f"Failed to write flame graph {path}: {e}")
+            return None
+        return path
+
+    def report(self) -> dict:
+        """
+        Summarize the profile for sending to the client
+        :return: timings in seconds, then either the path of the flame graph or the sympy call count, hottest
+        functions by cumulative time and peak memory in bytes. Everything but the total is measured inside stages only;
+        the total is the wall clock time of the request, including sending results over the web socket.
+        """
+        result = {"total": self.elapsed, "stages": self.stages}
+        if not self.owns_lock:
+            return result
+        if self._sampler is not None:
+            if self.flame_graph is not None:
+                result["flame_graph"] = self.flame_graph
+            return result
+
+        stats = pstats.Stats(self.profile).stats
+        result["sympy_calls"] = sum(calls for (filename, _, _), (_, calls, _, _, _) in stats.items()
+                                    if SYMPY_PATH in filename)
+        hottest = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:PROFILE_TOP_FUNCTIONS]
+        result["top_functions"] = [
+            {"function": f"{os.path.basename(filename)}:{line}({name})", "calls": calls, "cumulative": cumulative}
+            for (filename, line, name), (_, calls, _, cumulative, _) in hottest
+        ]
+        result["peak_memory"] = self.peak_memory
+        return result
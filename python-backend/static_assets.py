@@ -0,0 +1,179 @@
+"""
+Serving of the bundled React UI with precompressed variants, cache headers and in-memory caching of small files
+
+Precompressed variants are generated at build time with:
+    python static_assets.py [build directory]
+which writes a .br and a .gz file next to every compressible file in the build directory.
+"""
+import argparse
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable
+
+import brotli
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from constants import STATIC_CACHE_MAX_FILE_SIZE, STATIC_COMPRESS_MIN_FILE_SIZE
+
+logger = logging.getLogger('rm_web_app')
+
+# content encoding -> file suffix of the precompressed variant, in order of preference
+ENCODINGS = {"br": ".br", "gzip": ".gz"}
+COMPRESSIBLE_SUFFIXES = {".css", ".html", ".js", ".json", ".map", ".svg", ".txt", ".ico"}
+# vite names bundled assets like assets/index-B1a2c3D4.js, where the suffix is a hash of the content
+HASHED_ASSET = re.compile(r"/assets/[^/]+-[A-Za-z0-9_-]{8}\.\w+$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+# anything without a content hash in its name has to be revalidated, which the ETag makes cheap
+REVALIDATE = "no-cache"
+
+
+@dataclass
+class Asset:
+    """
+    A file in the build directory together with its precompressed variants
+    """
+    mtime: float
+    size: int
+    etag: str
+    # content encoding (empty for identity) -> path of the variant
+    variants: dict[str, str]
+    # content encoding -> body, for variants small enough to keep in memory
+    bodies: dict[str, bytes] = field(default_factory=dict)
+
+
+def accepted_encodings(accept_encoding: str) -> dict[str, float]:
+    """
+    Parse an Accept-Encoding request header
+    :param accept_encoding: header value, e.g. "gzip, deflate, br;q=0.5"
+    :return: quality value of each listed encoding (including "*"), 1 where none is given
+    """
+    accepted = {}
+    for item in accept_encoding.split(","):
+        encoding, _, parameters = item.strip().partition(";")
+        if not encoding.strip():
+            continue
+        quality = re.search(r"q=([0-9.]+)", parameters)
+        try:
+            accepted[encoding.strip().lower()] = float(quality.group(1)) if quality else 1.0
+        except ValueError:
+            continue
+    return accepted
+
+
+def negotiate_encoding(accept_encoding: str, available: Iterable[str]) -> str:
+    """
+    Pick the content encoding to serve
+    :param accept_encoding: Accept-Encoding request header value
+    :param available: encodings that have a precompressed variant
+    :return: the available encoding with the highest quality value, ties broken by ENCODINGS order, or "" for the
+    uncompressed file if the client accepts none of them or explicitly prefers identity
+    """
+    accepted = accepted_encodings(accept_encoding)
+    wildcard = accepted.get("*", 0.0)
+    encoding, quality = max(((encoding, accepted.get(encoding, wildcard)) for encoding in ENCODINGS
+                             if encoding in available),
+                            key=lambda candidate: candidate[1], default=("", 0.0))
+    if quality <= 0 or quality < accepted.get("identity", 0.0):
+        return ""
+    return encoding
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles that serves a .br or .gz sibling of the requested file when the client accepts it, marks
+    content-hashed assets as immutable, answers conditional requests with 304 and keeps small files in memory
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.assets: dict[str, Asset] = {}
+
+    def asset(self, full_path: str, stat_result: os.stat_result) -> Asset:
+        """
+        Look up a file and its variants, (re)reading them if the file has changed since it was last served
+        """
+        asset = self.assets.get(full_path)
+        if asset is not None and asset.mtime == stat_result.st_mtime and asset.size == stat_result.st_size:
+            return asset
+
+        with open(full_path, "rb") as f:
+            content = f.read()
+        variants = {"": full_path}
+        for encoding, suffix in ENCODINGS.items():
+            if os.path.isfile(full_path + suffix):
+                variants[encoding] = full_path + suffix
+        asset = Asset(mtime=stat_result.st_mtime, size=stat_result.st_size,
+                      etag=hashlib.sha256(content).hexdigest()[:32], variants=variants)
+        for encoding, path in variants.items():
+            if os.path.getsize(path) <= STATIC_CACHE_MAX_FILE_SIZE:
+                with open(path, "rb") as f:
+                    asset.bodies[encoding] = f.read()
+        self.assets[full_path] = asset
+        return asset
+
+    def file_response(self, full_path: str, stat_result: os.stat_result, scope: Scope,
+                      status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        asset = self.asset(str(full_path), stat_result)
+
+        encoding = negotiate_encoding(request_headers.get("accept-encoding", ""), asset.variants)
+        headers = {
+            # each encoding is a different representation, so it gets its own entity tag
+            "etag": f'"{asset.etag}{"-" + encoding if encoding else ""}"',
+            "cache-control": IMMUTABLE if HASHED_ASSET.search(str(full_path).replace(os.sep, "/")) else REVALIDATE,
+            "vary": "Accept-Encoding",
+        }
+        if encoding:
+            headers["content-encoding"] = encoding
+
+        if self.is_not_modified(Headers(headers), request_headers):
+            return NotModifiedResponse(Headers(headers))
+
+        # the media type comes from the requested file, not the .br/.gz variant
+        media_type = mimetypes.guess_type(full_path)[0] or "text/plain"
+        if encoding in asset.bodies:
+            return Response(asset.bodies[encoding], status_code=status_code, headers=headers, media_type=media_type)
+        return FileResponse(asset.variants[encoding], status_code=status_code, headers=headers,
+                            media_type=media_type)
+
+
+def precompress(directory: Path) -> int:
+    """
+    Write brotli and gzip compressed copies of every compressible file in a directory tree. Outputs are
+    deterministic, and a variant is only kept if it is smaller than the original.
+    :param directory: root of the build output
+    :return: the number of variants written
+    """
+    written = 0
+    for path in sorted(directory.rglob("*")):
+        if not path.is_file() or path.suffix not in COMPRESSIBLE_SUFFIXES:
+            continue
+        content = path.read_bytes()
+        if len(content) < STATIC_COMPRESS_MIN_FILE_SIZE:
+            continue
+        for suffix, compressed in ((".br", brotli.compress(content, quality=11)),
+                                   (".gz", gzip.compress(content, compresslevel=9, mtime=0))):
+            variant = path.with_name(path.name + suffix)
+            if len(compressed) < len(content):
+                variant.write_bytes(compressed)
+                written += 1
+            elif variant.exists():
+                variant.unlink()
+    logger.info(f"Wrote {written} precompressed files to {directory}")
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompress the React build output with brotli and gzip")
+    parser.add_argument("directory", type=Path, nargs="?", default=Path(__file__).parent.resolve() / "build")
+    args = parser.parse_args()
+    print(f"Wrote {precompress(args.directory)} precompressed files to {args.directory}")
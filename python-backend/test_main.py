@@ -1,12 +1,21 @@
 """
 Unit tests
 """
+import base64
+import gzip
+import json
+import signal
+from pathlib import Path
+
 import mpmath
 import pytest
 from pytest_check import check
 from sympy import sympify, simplify, SympifyError, Symbol
 
+import constant_index
 import custom_exceptions
+import profiling
+import static_assets
 from input import Input, parse, reformat
 from math_utils import laurent, assess_convergence
 from wolfram_client import WolframClient
@@ -104,3 +113,161 @@ def test_convergence_test() -> None:
     assert assess_convergence('3/4 - 1/(16*n**2) + o(1/n**2)', v) is True
     assert assess_convergence('5', v) is True
     assert assess_convergence('4*n**3 + 1', v) is False
+
+
+def test_constant_index(tmp_path) -> None:
+    index = tmp_path / "constant_index.bin"
+    assert constant_index.build(index) > 0
+    assert constant_index.identify("0.63661977236758134307553505349005744813783858296182", index) == ["2/pi"]
+    assert constant_index.identify("1.39221119117733281437655287847981652837", index) == ["1/(e - 2)"]
+    assert constant_index.identify("-0.72134752044448170367996234050095", index) == ["-1/(2*ln2)"]
+    # labels use LIReC's constant names, in which E is the Erdos-Borwein constant
+    assert constant_index.identify("2.71828182845904523536028747135266", index) == ["e"]
+    assert constant_index.identify("1.20205690315959428539973816151144", index) == ["Zeta3"]
+    assert constant_index.identify("0.57721566490153286060651209008240", index) == ["gamma"]
+    # the digit after the compared prefix is 9 and must not round up into it
+    assert constant_index.identify("1.27323954473516268615107010698", index) == ["4/pi"]
+    assert constant_index.identify("3.1415926535897932384626433832795", index) == ["pi"]
+    assert constant_index.identify("-7.2134752044448170367996234050095e-1", index) == ["-1/(2*ln2)"]
+    # too few digits to trust a match
+    assert constant_index.identify("0.6366197723", index) == []
+    assert constant_index.identify("1.23456789123456789123456789", index) == []
+    assert constant_index.identify("Infinity", index) == []
+    assert constant_index.identify("1.27323954473516268615107010698011489627567716592365",
+                                   tmp_path / "missing.bin") == []
+    truncated = tmp_path / "truncated.bin"
+    truncated.write_bytes(index.read_bytes()[:5])
+    assert constant_index.identify("1.27323954473516268615107010698011489627567716592365", truncated) == []
+    # rebuilding replaces the file rather than truncating it under an existing memory mapping
+    mapped = constant_index._open(index)[0]
+    last_record = mapped[-constant_index.LABEL_WIDTH:]
+    constant_index.build(index, coefficient_range=1)
+    assert mapped[-constant_index.LABEL_WIDTH:] == last_record
+    assert [path.name for path in tmp_path.iterdir() if path.name.startswith(".")] == []
+
+
+def test_constant_index_reproducible(tmp_path) -> None:
+    constant_index.build(tmp_path / "first.bin", coefficient_range=1)
+    constant_index.build(tmp_path / "second.bin", coefficient_range=1)
+    assert (tmp_path / "first.bin").read_bytes() == (tmp_path / "second.bin").read_bytes()
+
+
+def test_accepted_encodings() -> None:
+    assert static_assets.accepted_encodings("gzip, deflate, br") == {"gzip": 1.0, "deflate": 1.0, "br": 1.0}
+    assert static_assets.accepted_encodings("gzip;q=0.5, br;q=0") == {"gzip": 0.5, "br": 0.0}
+    assert static_assets.accepted_encodings("") == {}
+    variants = ["", "br", "gzip"]
+    assert static_assets.negotiate_encoding("gzip, deflate, br", variants) == "br"
+    # the client's preference wins over the server's
+    assert static_assets.negotiate_encoding("gzip;q=1, br;q=0.1", variants) == "gzip"
+    assert static_assets.negotiate_encoding("br;q=0, gzip;q=0", variants) == ""
+    # a wildcard accepts every encoding that is not listed explicitly
+    assert static_assets.negotiate_encoding("*", variants) == "br"
+    assert static_assets.negotiate_encoding("br;q=0, *;q=0.5", variants) == "gzip"
+    assert static_assets.negotiate_encoding("gzip;q=0.5, identity", variants) == ""
+    assert static_assets.negotiate_encoding("br", ["", "gzip"]) == ""
+
+
+def test_precompressed_static_files(tmp_path) -> None:
+    (tmp_path / "assets").mkdir()
+    script = tmp_path / "assets" / "index-B1a2c3D4.js"
+    script.write_text("console.log('ramanujan');\n" * 200)
+    (tmp_path / "index.html").write_text("<html></html>")
+    assert static_assets.precompress(tmp_path) == 2
+    assert gzip.decompress((tmp_path / "assets" / "index-B1a2c3D4.js.gz").read_bytes()) == script.read_bytes()
+    assert not (tmp_path / "index.html.gz").exists()
+
+    files = static_assets.PrecompressedStaticFiles(directory=tmp_path)
+
+    def get(path: Path, headers: dict[str, str]):
+        scope = {"type": "http", "method": "GET", "headers": [(k.encode(), v.encode()) for k, v in headers.items()]}
+        return files.file_response(str(path), path.stat(), scope)
+
+    response = get(script, {"accept-encoding": "gzip, br"})
+    assert response.headers["content-encoding"] == "br"
+    assert response.headers["cache-control"] == static_assets.IMMUTABLE
+    assert response.media_type in ("text/javascript", "application/javascript")
+    assert response.body == (tmp_path / "assets" / "index-B1a2c3D4.js.br").read_bytes()
+
+    response = get(script, {"accept-encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert get(script, {"accept-encoding": "gzip", "if-none-match": response.headers["etag"]}).status_code == 304
+
+    response = get(tmp_path / "index.html", {"accept-encoding": "gzip, br"})
+    assert "content-encoding" not in response.headers
+    assert response.headers["cache-control"] == static_assets.REVALIDATE
+    assert response.body == b"<html></html>"
+    assert get(tmp_path / "index.html", {"if-none-match": response.headers["etag"]}).status_code == 304
+
+
+def test_request_profiler() -> None:
+    with profiling.RequestProfiler() as profiler:
+        with profiler.stage("simplify"):
+            assert simplify(sympify(reformat(TEST_INPUT_7)) / sympify(reformat(TEST_INPUT_8))) == sympify(SIMPLIFIED_7_8)
+    report = profiler.report()
+    assert set(report["stages"]) == {"simplify"}
+    assert report["total"] >= report["stages"]["simplify"] > 0
+    assert report["sympy_calls"] > 0
+    assert report["peak_memory"] > 0
+    assert len(report["top_functions"]) > 0
+    assert "flame_graph" not in report
+
+
+def test_request_profiler_flame_graph(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(profiling, "PROFILE_OUTPUT_DIRECTORY", str(tmp_path))
+    with profiling.RequestProfiler() as profiler:
+        with profiler.stage("simplify"):
+            assert simplify(sympify(reformat(TEST_INPUT_7)) / sympify(reformat(TEST_INPUT_8))) == sympify(SIMPLIFIED_7_8)
+    report = profiler.report()
+    assert report["stages"]["simplify"] > 0
+    # the sampler thread would show up in cProfile and tracemalloc results, so they are not collected while sampling
+    assert "top_functions" not in report and "peak_memory" not in report
+    with open(report["flame_graph"]) as f:
+        stack, count = f.readline().rsplit(" ", 1)
+    assert int(count) > 0 and ";" in stack
+
+
+def test_null_profiler() -> None:
+    with profiling.NullProfiler() as profiler:
+        with profiler.stage("anything"):
+            pass
+    assert profiler.enabled is False
+
+
+@pytest.mark.parametrize("credentials, profiled", [
+    (("user", "password"), True),
+    (None, False),
+    (("user", "wrong"), False),
+])
+def test_debug_profile_requires_authentication(tmp_path, monkeypatch, credentials, profiled) -> None:
+    # main needs the protoc generated gRPC client and a React build directory to import
+    pytest.importorskip("lirec_pb2")
+    (tmp_path / "build").mkdir()
+    (tmp_path / "build" / "index.html").write_text("<html></html>")
+    monkeypatch.chdir(tmp_path)
+    from fastapi.testclient import TestClient
+    import main
+    # importing call_wrapper arms a SIGALRM that only the stubbed out calls below would clear
+    signal.alarm(0)
+
+    monkeypatch.setattr(main.CustomSecrets, "BasicUser", "user")
+    monkeypatch.setattr(main.CustomSecrets, "BasicPassword", "password")
+    monkeypatch.setattr(main.call_wrapper, "pcf_limit", lambda a, b, n: "1.618")
+    monkeypatch.setattr(main.call_wrapper, "lirec_identify", lambda limit: ["GoldenRatio"])
+    monkeypatch.setattr(main, "chart_coordinates", lambda pcf, limit, iterations: [])
+
+    headers = {}
+    if credentials is not None:
+        headers["Authorization"] = "Basic " + base64.b64encode(":".join(credentials).encode("utf8")).decode("ascii")
+    body = {"a": "1", "b": "1", "i": 10, "symbol": ""}
+    with TestClient(main.app).websocket_connect("/data", headers=headers) as websocket:
+        websocket.send_json({**body, "debug": True})
+        assert list(websocket.receive_json()) == ["limit"]
+        assert list(websocket.receive_json()) == ["converges_to"]
+        assert list(websocket.receive_json()) == ["delta"]
+        if profiled:
+            profile = json.loads(websocket.receive_json()["profile"])
+            assert set(profile["stages"]) == {"parse", "limit", "identify", "chart"}
+        # without a profile, the next message already answers a follow-up request
+        websocket.send_json(body)
+        assert list(websocket.receive_json()) == ["limit"]
@@ -7,7 +7,7 @@ from json import JSONDecodeError
 
 import requests
 
-from constants import WOLFRAM_CHAR_LIMIT
+from constants import WOLFRAM_API_URL, WOLFRAM_CHAR_LIMIT
 from custom_exceptions import APIError
 from custom_secrets import CustomSecrets
 
@@ -36,8 +36,7 @@ class WolframClient:
             # for now we only need the Limit pod, but when add further calculations we will need to specify those pods
             # we are also only asking for plaintext and moutput because by default there is also additional output such
             # as a plot image url, but we are plotting in the frontend
-            result = requests.get("https://api.wolframalpha.com/v2/query",
-                                  params)
+            result = requests.get(WOLFRAM_API_URL, params)
         except Exception as e:
             logger.error("Wolfram API returned error", e)
         else: